@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+frame_stream.py — Stream captured scan frames from the capture host (Raspberry Pi)
+to an analysis host over a TCP or Unix socket, instead of writing frame_N.txt
+files on the Pi and copying them over.
+
+Addresses:
+  host:port         TCP (e.g. 192.168.1.20:5555, or :5555 to listen on all interfaces)
+  unix:<path>       Unix domain socket (e.g. unix:/tmp/capri1.sock)
+
+Sender side (capture host):
+  FrameSender queues frames from the capture loop, packs them into batches and
+  sends them on a background thread. Backpressure: the queue is bounded and at
+  most --max-inflight batches may be unacknowledged, so a slow receiver stalls
+  submit() rather than growing memory on the Pi.
+  scan_chain_capture_10cc.py --stream <addr> uses it; `fake` below drives it
+  with random frames so the whole path can be exercised on one Linux host.
+
+Receiver side (analysis host):
+  `recv` accepts senders until Ctrl-C (one connection per capture run/shot),
+  acknowledges every batch once it is handled, and for each frame either writes
+  <outdir>/shot_<S>/frame_<C>.txt (same format as the capture script) or, with
+  --layout, decodes it in-process with map.py and group.py into
+  <outdir>/shot_<S>/frame_<C>/.
+
+Wire format (little-endian):
+  batch   : "SCB1" u8 version, u8 pad, u16 count, u32 seq, u64 t_send_ns, then count frames
+  frame   : u32 shot, u32 cycle, u64 t_capture_ns, u32 nbits, then ceil(nbits/8) bytes
+            of bits packed MSB-first in shift-out order
+  ack     : "SCA1" u32 seq   (receiver → sender)
+
+Example (one host):
+  python3 frame_stream.py recv --listen unix:/tmp/capri1.sock --outdir stream_out \\
+          --layout scan_layout_z_removed.txt --format packed &
+  python3 frame_stream.py fake --connect unix:/tmp/capri1.sock --shots 2 --cycles 10
+"""
+import argparse
+import os
+import queue
+import random
+import socket
+import stat
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import group
+import map as scan_map
+
+_BATCH_MAGIC = b"SCB1"
+_ACK_MAGIC = b"SCA1"
+_VERSION = 1
+_BATCH_HEADER = struct.Struct("<4sBxHIQ")
+_FRAME_HEADER = struct.Struct("<IIQI")
+_ACK = struct.Struct("<4sI")
+
+# Receivers refuse frames larger than this (guards against a corrupt stream)
+_MAX_FRAME_BITS = 1 << 24
+
+Frame = namedtuple("Frame", "shot cycle t_capture_ns t_send_ns bits")
+
+# ---------- Protocol ----------
+def pack_bit_string(bits: str) -> bytes:
+    "Pack a '0'/'1' string MSB-first, zero-padded to a whole byte."
+    if not bits:
+        return b""
+    pad = -len(bits) % 8
+    return int(bits + "0" * pad, 2).to_bytes((len(bits) + pad) // 8, "big")
+
+def unpack_bit_string(data: bytes, nbits: int) -> str:
+    if nbits == 0:
+        return ""
+    s = format(int.from_bytes(data, "big"), f"0{len(data) * 8}b")
+    return s[:nbits]
+
+def encode_batch(seq: int, frames: List[Frame]) -> bytes:
+    parts = [_BATCH_HEADER.pack(_BATCH_MAGIC, _VERSION, len(frames), seq, time.time_ns())]
+    for fr in frames:
+        parts.append(_FRAME_HEADER.pack(fr.shot, fr.cycle, fr.t_capture_ns, len(fr.bits)))
+        parts.append(pack_bit_string(fr.bits))
+    return b"".join(parts)
+
+def _recv_exact(sock: socket.socket, n: int) -> Optional[bytes]:
+    "Read exactly n bytes; None on clean EOF before the first byte."
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            if not buf:
+                return None
+            raise ConnectionError("connection closed mid-message")
+        buf += chunk
+    return bytes(buf)
+
+def read_batch(sock: socket.socket):
+    "Read one batch. Returns (seq, [Frame, ...]) or None at end of stream."
+    hdr = _recv_exact(sock, _BATCH_HEADER.size)
+    if hdr is None:
+        return None
+    magic, version, count, seq, t_send_ns = _BATCH_HEADER.unpack(hdr)
+    if magic != _BATCH_MAGIC or version != _VERSION:
+        raise ConnectionError(f"bad batch header (magic={magic!r}, version={version})")
+    frames = []
+    for _ in range(count):
+        fh = _recv_exact(sock, _FRAME_HEADER.size)
+        if fh is None:
+            raise ConnectionError("connection closed mid-batch")
+        shot, cycle, t_capture_ns, nbits = _FRAME_HEADER.unpack(fh)
+        if nbits > _MAX_FRAME_BITS:
+            raise ConnectionError(f"frame too large ({nbits} bits)")
+        nbytes = (nbits + 7) // 8
+        payload = _recv_exact(sock, nbytes) if nbytes else b""
+        if payload is None:
+            raise ConnectionError("connection closed mid-frame")
+        frames.append(Frame(shot, cycle, t_capture_ns, t_send_ns, unpack_bit_string(payload, nbits)))
+    return seq, frames
+
+# ---------- Sockets ----------
+def _is_socket(path: str) -> bool:
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+def _open_socket(addr: str, listen: bool, timeout: Optional[float] = None) -> socket.socket:
+    if addr.startswith("unix:"):
+        path = addr[len("unix:"):]
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if listen:
+            if os.path.lexists(path):
+                # Only replace a stale socket, never a regular file
+                if not _is_socket(path):
+                    sock.close()
+                    raise FileExistsError(f"{path} exists and is not a socket")
+                os.unlink(path)
+            sock.bind(path)
+            sock.listen(1)
+        else:
+            sock.settimeout(timeout)
+            sock.connect(path)
+        return sock
+
+    host, sep, port = addr.rpartition(":")
+    if not sep:
+        raise ValueError(f"bad address {addr!r} (expected host:port or unix:<path>)")
+    if listen:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host or "0.0.0.0", int(port)))
+        sock.listen(1)
+    else:
+        sock = socket.create_connection((host or "127.0.0.1", int(port)), timeout=timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+# ---------- Sender ----------
+class FrameSender:
+    """
+    Background batching sender.
+
+    submit() blocks while the queue is full; the send thread blocks while
+    max_inflight batches are unacknowledged. A batch is sent once it holds
+    batch_size frames or batch_delay seconds passed since its first frame.
+    close() flushes everything and waits for the final acknowledgement.
+
+    Every blocking step (connect, send, waiting for an ack while batches are
+    in flight, submit() on a full queue, close()) gives up after `timeout`
+    seconds with TimeoutError. After a failure, unacked() returns the frames
+    the receiver has not confirmed so the caller can keep them locally.
+    """
+
+    def __init__(self, addr: str, batch_size: int = 8, batch_delay: float = 0.05,
+                 queue_size: int = 64, max_inflight: int = 4, timeout: float = 10.0):
+        self._timeout = timeout
+        self._sock = _open_socket(addr, listen=False, timeout=timeout)
+        self._batch_size = min(max(1, batch_size), 0xFFFF)  # u16 count in the batch header
+        self._batch_delay = batch_delay
+        self._queue: "queue.Queue[Optional[Frame]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._window = threading.Semaphore(max(1, max_inflight))
+        self._error: Optional[BaseException] = None
+        self._closing = False
+        self._acked = 0
+        self._sent = 0
+        # Frames not yet acknowledged (submit order) and the size of each batch in flight
+        self._lock = threading.Lock()
+        self._pending: "deque[Frame]" = deque()
+        self._batch_sizes: "deque[int]" = deque()
+        self._send_thread = threading.Thread(target=self._send_loop, name="frame-send", daemon=True)
+        self._ack_thread = threading.Thread(target=self._ack_loop, name="frame-ack", daemon=True)
+        self._send_thread.start()
+        self._ack_thread.start()
+
+    def submit(self, shot: int, cycle: int, bits: str, t_capture_ns: Optional[int] = None) -> None:
+        "Queue one frame ('0'/'1' string in shift-out order)."
+        if not 0 <= shot <= 0xFFFFFFFF or not 0 <= cycle <= 0xFFFFFFFF:
+            raise ValueError(f"shot/cycle must fit in 32 bits (shot={shot}, cycle={cycle})")
+        if not isinstance(bits, str) or bits.strip("01") or len(bits) > _MAX_FRAME_BITS:
+            raise ValueError(f"bits must be a string of at most {_MAX_FRAME_BITS} '0'/'1' characters")
+        if t_capture_ns is None:
+            t_capture_ns = time.time_ns()
+        if not 0 <= t_capture_ns < 1 << 64:
+            raise ValueError(f"t_capture_ns out of range ({t_capture_ns})")
+        if self._error is not None:
+            raise ConnectionError("frame stream failed") from self._error
+        fr = Frame(shot, cycle, t_capture_ns, 0, bits)
+        with self._lock:
+            self._pending.append(fr)
+        try:
+            self._queue.put(fr, timeout=self._timeout)
+        except queue.Full:
+            with self._lock:
+                self._pending.pop()
+            self._fail(TimeoutError(f"send queue full for {self._timeout} s"))
+            raise ConnectionError("frame stream failed") from self._error
+
+    def unacked(self) -> List[Frame]:
+        "Frames submitted but not (yet) acknowledged by the receiver, in submit order."
+        with self._lock:
+            return list(self._pending)
+
+    def close(self) -> None:
+        self._closing = True
+        try:
+            self._queue.put(None, timeout=self._timeout)
+        except queue.Full:
+            self._fail(TimeoutError(f"send queue full for {self._timeout} s"))
+        self._send_thread.join(self._timeout)
+        if not self._send_thread.is_alive():
+            try:
+                self._sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+            self._ack_thread.join(self._timeout)
+        if self._send_thread.is_alive() or self._ack_thread.is_alive():
+            self._fail(TimeoutError(f"receiver did not finish within {self._timeout} s"))
+        self._sock.close()
+        if self._error is not None:
+            raise ConnectionError("frame stream failed") from self._error
+        if self._acked != self._sent:
+            raise ConnectionError(f"receiver acknowledged {self._acked}/{self._sent} batches")
+
+    def abort(self) -> None:
+        "Drop the connection without waiting; unacked() stays available."
+        self._fail(ConnectionError("aborted"))
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _fail(self, e: BaseException) -> None:
+        if self._error is None:
+            self._error = e
+        # Wake both threads (blocked send/recv, exhausted window)
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._window.release()
+
+    def _send_loop(self) -> None:
+        done = False
+        try:
+            while not done:
+                first = self._queue.get()
+                if first is None:
+                    break
+                batch = [first]
+                deadline = time.monotonic() + self._batch_delay
+                while len(batch) < self._batch_size:
+                    timeout = deadline - time.monotonic()
+                    try:
+                        fr = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if fr is None:
+                        done = True
+                        break
+                    batch.append(fr)
+                if not self._window.acquire(timeout=self._timeout):
+                    raise TimeoutError(f"no ack from receiver for {self._timeout} s")
+                if self._error is not None:
+                    break
+                with self._lock:
+                    self._batch_sizes.append(len(batch))
+                self._sock.sendall(encode_batch(self._sent, batch))
+                self._sent += 1
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            # Unblock producers stuck on a full queue after a failure
+            while self._error is not None and not self._queue.empty():
+                self._queue.get_nowait()
+
+    def _ack_loop(self) -> None:
+        try:
+            while True:
+                try:
+                    msg = _recv_exact(self._sock, _ACK.size)
+                except socket.timeout:
+                    # Idle between frames is fine; a missing ack or a stalled close is not
+                    if self._sent == self._acked and not self._closing:
+                        continue
+                    raise TimeoutError(f"no ack from receiver for {self._timeout} s")
+                if msg is None:
+                    if self._send_thread.is_alive():
+                        raise ConnectionError("receiver closed the connection")
+                    break
+                magic, seq = _ACK.unpack(msg)
+                if magic != _ACK_MAGIC or seq != self._acked:
+                    raise ConnectionError(f"unexpected ack {magic!r} seq={seq}")
+                with self._lock:
+                    for _ in range(self._batch_sizes.popleft()):
+                        self._pending.popleft()
+                self._acked += 1
+                self._window.release()
+        except BaseException as e:
+            self._fail(e)
+
+# ---------- Receiver ----------
+def serve(addr: str, handle: Callable[[Frame], None], connections: int = 0) -> int:
+    """
+    Accept senders one after another (`connections` of them, or until Ctrl-C
+    when 0) and call handle(frame) for every frame received. Each batch is
+    acknowledged after all its frames were handled, so a slow handler throttles
+    the sender. A broken connection is logged and the next one is accepted.
+    Returns the frame count.
+    """
+    lsock = _open_socket(addr, listen=True)
+    print(f"[recv] listening on {addr}")
+    total = 0
+    served = 0
+    try:
+        while connections == 0 or served < connections:
+            conn, peer = lsock.accept()
+            served += 1
+            print(f"[recv] connection from {peer or 'unix socket'}")
+            with conn:
+                try:
+                    while True:
+                        rec = read_batch(conn)
+                        if rec is None:
+                            break
+                        seq, frames = rec
+                        for fr in frames:
+                            handle(fr)
+                        total += len(frames)
+                        conn.sendall(_ACK.pack(_ACK_MAGIC, seq))
+                except OSError as e:
+                    print(f"[recv] connection dropped: {e}")
+    except KeyboardInterrupt:
+        print("[recv] interrupted")
+    finally:
+        lsock.close()
+        if addr.startswith("unix:"):
+            path = addr[len("unix:"):]
+            if _is_socket(path):
+                os.unlink(path)
+    return total
+
+class FrameWriter:
+    """
+    Frame handler for serve(): writes raw frame_<C>.txt files, or decodes frames
+    with map.py/group.py when a layout is given.
+    """
+
+    def __init__(self, outdir: Path, layout: Optional[Path] = None, fmt: str = "text",
+                 dict_dir: Optional[Path] = None):
+        self.outdir = outdir
+        self.fmt = fmt
+        self.dict_dir = dict_dir or outdir
+        self.layout = None
+        self.soc_dict = None
+        if layout is not None:
+            self.layout = scan_map.load_layout(layout)
+
+    def __call__(self, fr: Frame) -> None:
+        shot_dir = self.outdir / f"shot_{fr.shot}"
+        shot_dir.mkdir(parents=True, exist_ok=True)
+        lag_ms = (time.time_ns() - fr.t_capture_ns) / 1e6
+        if self.layout is None:
+            dst = shot_dir / f"frame_{fr.cycle}.txt"
+            dst.write_text(fr.bits + "\n")
+        else:
+            dst = shot_dir / f"frame_{fr.cycle}"
+            dst.mkdir(exist_ok=True)
+            entries = scan_map.map_bits([int(ch) for ch in fr.bits], self.layout)
+            self.soc_dict = group.emit_outputs(dst, entries, self.fmt, self.dict_dir, self.soc_dict)
+        print(f"[recv] shot {fr.shot} cycle {fr.cycle}: {len(fr.bits)} bits -> {dst} "
+              f"(capture→stored {lag_ms:.1f} ms)")
+
+# ---------- Fake capture source ----------
+def fake_frames(shots: int, cycles: int, chain_length: int, seed: int = 0):
+    "Yield (shot, cycle, bits) with random bit strings, standing in for the scan chain."
+    rng = random.Random(seed)
+    for shot in range(shots):
+        for cycle in range(cycles):
+            yield shot, cycle, format(rng.getrandbits(chain_length), f"0{chain_length}b")
+
+# ---------- Main ----------
+def main():
+    ap = argparse.ArgumentParser(description="Stream scan-chain frames between capture and analysis hosts.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("recv", help="receive frames and store/decode them")
+    r.add_argument("--listen", required=True, help="host:port or unix:<path>")
+    r.add_argument("--outdir", default="stream_out", help="output directory")
+    r.add_argument("--layout", help="scan layout; decode frames with map.py/group.py instead of writing .txt")
+    r.add_argument("--format", choices=("text", "packed"), default="text", help="group.py SoC bits format")
+    r.add_argument("--dict-dir", help="signal dictionary directory for --format packed (default: <outdir>)")
+    r.add_argument("--connections", type=int, default=0,
+                   help="number of sender sessions to serve (default 0: until Ctrl-C)")
+
+    f = sub.add_parser("fake", help="send random frames (stand-in for the Pi capture loop)")
+    f.add_argument("--connect", required=True, help="host:port or unix:<path>")
+    f.add_argument("--shots", type=int, default=1)
+    f.add_argument("--cycles", type=int, default=10)
+    f.add_argument("--chain-length", type=int, default=12756)
+    f.add_argument("--seed", type=int, default=0)
+
+    f.add_argument("--batch-size", type=int, default=8, help="frames per batch")
+    f.add_argument("--batch-delay", type=float, default=0.05, help="max seconds to wait filling a batch")
+    f.add_argument("--max-inflight", type=int, default=4, help="unacknowledged batches before blocking")
+    f.add_argument("--timeout", type=float, default=10.0, help="seconds before a stalled receiver is an error")
+
+    args = ap.parse_args()
+
+    if args.cmd == "recv":
+        outdir = Path(args.outdir)
+        outdir.mkdir(parents=True, exist_ok=True)
+        writer = FrameWriter(outdir, Path(args.layout) if args.layout else None, args.format,
+                             Path(args.dict_dir) if args.dict_dir else None)
+        n = serve(args.listen, writer, args.connections)
+        print(f"[recv] {n} frames received")
+        return
+
+    t0 = time.monotonic()
+    n = 0
+    with FrameSender(args.connect, batch_size=args.batch_size, batch_delay=args.batch_delay,
+                     max_inflight=args.max_inflight, timeout=args.timeout) as sender:
+        for shot, cycle, bits in fake_frames(args.shots, args.cycles, args.chain_length, args.seed):
+            sender.submit(shot, cycle, bits)
+            n += 1
+    print(f"[fake] sent {n} frames in {time.monotonic() - t0:.2f} s")
+
+if __name__ == "__main__":
+    main()
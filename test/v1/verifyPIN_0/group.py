@@ -14,12 +14,29 @@ Input:
   --map    <path>   map.out produced by create_map.py (TSV: idx, signal, val)
 Outputs:
   --outdir <dir>    directory to write outputs (defaults to current dir):
+                    --format text (default):
                     - bank0_words.out
                     - bank1_words.out
                     - soc_bits.out
+                    --format packed:
+                    - frame.bin
+
+Packed mode (--format packed):
+  The whole frame is written as frame.bin: a small header followed by the SoC
+  bits in base-signal id order and the 2×4096 SRAM bank bits, packed MSB-first
+  (about 1.6 KB instead of about 384 KB of text). Base-signal ids, categories,
+  paths and bit widths live in a signal dictionary shared by all frames of the
+  same scan layout: <--dict-dir>/soc_dict_<fingerprint>.json. A new layout gets
+  a new dictionary; existing ones are never overwritten.
+
+  Render the text files of a packed frame on demand (found via the header fingerprint):
+    python3 group.py --render frame_1/frame.bin --dict-dir .
 """
 import argparse
+import hashlib
+import json
 import re
+import struct
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
@@ -202,38 +219,47 @@ def determine_category(path: str) -> str:
     return "other"
 
 # ---------- Emitters ----------
-def emit_bank_files(outdir: Path, bank_bits: Dict[int, Dict[int, Dict[int, int]]]) -> None:
+def build_bank_layout(bank_src: Dict[int, Dict[int, Dict[int, int]]]) -> List[List[int]]:
+    """
+    For each SRAM bank (0, 1), the map.out idx of every bit in print order
+    (word 0..127, bit 31..0), with -1 for bits missing from the layout.
+    """
+    return [[bank_src.get(bank, {}).get(w, {}).get(b, -1) for w in range(128) for b in range(31, -1, -1)]
+            for bank in (0, 1)]
+
+def render_bank_lines(bank: int, src: List[int], bits: List[int]):
+    "Yield the bank<N>_words.out text, given the bank's bits in print order (missing bits as 0)."
+    yield f"# SRAM Bank {bank} — 128 words × 32 bits, printed as word[W].bit[31..0]: 0b... : 0x........\n"
+    for w in range(128):
+        msb_to_lsb = bits[w * 32:(w + 1) * 32]
+        # Keep original 0b/0x summary lines for SRAM words
+        v = 0
+        for bit in msb_to_lsb:
+            v = (v << 1) | (bit & 1)
+        bstr = "0b" + "".join(str(b & 1) for b in msb_to_lsb)
+        hstr = "0x" + format(v, "08X")
+        yield f"word[{w}].bit[31..0]: {bstr}:  {hstr}\n"
+    missing = src.count(-1)
+    if missing:
+        yield f"# WARNING: {missing} missing bits were filled with 0.\n"
+
+def emit_bank_files(outdir: Path, bank_layout: List[List[int]], values: Dict[int, int]) -> None:
     for bank in (0, 1):
+        src = bank_layout[bank]
+        bits = [values[i] if i >= 0 else 0 for i in src]
         outp = outdir / f"bank{bank}_words.out"
         with outp.open("w", encoding="utf-8") as f:
-            f.write(f"# SRAM Bank {bank} — 128 words × 32 bits, printed as word[W].bit[31..0]: 0b... : 0x........\n")
-            missing = []
-            for w in range(128):
-                row = bank_bits.get(bank, {}).get(w, {})
-                msb_to_lsb = []
-                for b in range(31, -1, -1):
-                    if b in row:
-                        msb_to_lsb.append(row[b])
-                    else:
-                        msb_to_lsb.append(0)
-                        missing.append((bank, w, b))
-                # Keep original 0b/0x summary lines for SRAM words
-                v = 0
-                for bit in msb_to_lsb:
-                    v = (v << 1) | (bit & 1)
-                bstr = "0b" + "".join(str(b & 1) for b in msb_to_lsb)
-                hstr = "0x" + format(v, "08X")
-                f.write(f"word[{w}].bit[31..0]: {bstr}:  {hstr}\n")
-            if missing:
-                f.write(f"# WARNING: {len(missing)} missing bits were filled with 0.\n")
+            f.write("".join(render_bank_lines(bank, src, bits)))
 
-def emit_soc_file(outdir: Path, soc_groups: Dict[str, List[Tuple[int, int, str, int]]]) -> None:
+def build_soc_layout(soc_groups: Dict[str, List[Tuple[int, int, str, int]]]) -> List[dict]:
     """
-    Write soc_bits.out with the requested categorization and compact per-base map lines.
-    For each base:
-      <base_path_with_upper_indices_preserved>[msb,msb-1,...,lsb] : <bits MSB..LSB>
-    Scalars:
-      <base_path> : <0|1>
+    Turn the grouped SoC bits into the ordered list of base-signal records that
+    soc_bits.out prints, one record per output line. Each record holds:
+      cat      category (see _CAT_ORDER)
+      path     base path (upper indices preserved, final bit index stripped)
+      indices  bit indices MSB..LSB for vectors, None for scalars
+      src      map.out idx of every bit, in print order
+    The record position is the base-signal id used by the packed format.
     """
     # Prepare first-appearance ordering
     group_items = []
@@ -249,73 +275,199 @@ def emit_soc_file(outdir: Path, soc_groups: Dict[str, List[Tuple[int, int, str,
         cat = determine_category(sample_path)
         categorized.setdefault(cat, []).append((first_idx, base, lst))
 
+    layout: List[dict] = []
+    for cat in _CAT_ORDER:
+        items = categorized.get(cat, [])
+        items.sort(key=lambda x: x[0])
+
+        for _, _, lst in items:
+            # Construct base path (preserve upper indices; drop final bit index)
+            # Use the first path for base-path derivation (all entries share same base)
+            sample = lst[0][2]
+            base_path = base_strip_last_bit_index(strip_tags(sample))
+
+            # Collect map indices by final-bit index and note scalars
+            by_index: Dict[int, int] = {}
+            scalars: List[int] = []
+            for idx_order, bit_idx, full_sig, val in lst:
+                if bit_idx is None or bit_idx < 0:
+                    scalars.append(idx_order)
+                else:
+                    by_index[bit_idx] = idx_order
+
+            if by_index:
+                # Indices MSB..LSB (present indices only, no gap-filling)
+                indices_desc = sorted(by_index.keys(), reverse=True)
+                layout.append({"cat": cat, "path": base_path, "indices": indices_desc,
+                               "src": [by_index[i] for i in indices_desc]})
+
+            # Scalars (if any) as separate records, preserving first appearance order
+            for idx_order in sorted(scalars):
+                layout.append({"cat": cat, "path": base_path, "indices": None, "src": [idx_order]})
+    return layout
+
+def render_soc_lines(layout: List[dict], bits: List[int]):
+    """
+    Yield the soc_bits.out text for a layout, given the bit values in layout order
+    (i.e. the concatenation of every record's bits, MSB..LSB).
+    """
+    yield "# SoC bits — compact map per base signal (MSB..LSB)\n"
+    yield "# Format: <base_path>[iN,iN-1,...,i0] : <bits>\n"
+    yield "# Scalars: <base_path> : <0|1>\n"
+
+    cat = None
+    pos = 0
+    for rec in layout:
+        if rec["cat"] != cat:
+            cat = rec["cat"]
+            yield f"\n== {cat} ==\n"
+        width = len(rec["src"])
+        vals = "".join(str(b & 1) for b in bits[pos:pos + width])
+        pos += width
+        if rec["indices"] is None:
+            yield f"{rec['path']} : {vals}\n"
+        else:
+            yield f"{rec['path']}[{','.join(str(i) for i in rec['indices'])}] : {vals}\n"
+
+def emit_soc_file(outdir: Path, soc_groups: Dict[str, List[Tuple[int, int, str, int]]]) -> None:
+    """
+    Write soc_bits.out with the requested categorization and compact per-base map lines.
+    For each base:
+      <base_path_with_upper_indices_preserved>[msb,msb-1,...,lsb] : <bits MSB..LSB>
+    Scalars:
+      <base_path> : <0|1>
+    """
+    layout = build_soc_layout(soc_groups)
+    values = {idx: val for lst in soc_groups.values() for idx, _, _, val in lst}
+    bits = [values[i] for rec in layout for i in rec["src"]]
+
     soc_out = outdir / "soc_bits.out"
     with soc_out.open("w", encoding="utf-8") as f:
-        f.write("# SoC bits — compact map per base signal (MSB..LSB)\n")
-        f.write("# Format: <base_path>[iN,iN-1,...,i0] : <bits>\n")
-        f.write("# Scalars: <base_path> : <0|1>\n")
-
-        for cat in _CAT_ORDER:
-            items = categorized.get(cat, [])
-            if not items:
-                continue
-            f.write(f"\n== {cat} ==\n")
-            items.sort(key=lambda x: x[0])
-
-            for _, _, lst in items:
-                # Construct base path (preserve upper indices; drop final bit index)
-                # Use the first path for base-path derivation (all entries share same base)
-                sample = lst[0][2]
-                base_path = base_strip_last_bit_index(strip_tags(sample))
-
-                # Collect values by final-bit index and note scalars
-                by_index: Dict[int, int] = {}
-                scalars: List[Tuple[int, int]] = []  # [(idx_order, val)]
-                for idx_order, bit_idx, full_sig, val in lst:
-                    if bit_idx is None or bit_idx < 0:
-                        scalars.append((idx_order, val))
-                    else:
-                        by_index[bit_idx] = val
-
-                if by_index:
-                    # Emit indices MSB..LSB (present indices only, no gap-filling)
-                    indices_desc = sorted(by_index.keys(), reverse=True)
-                    bits_desc = "".join(str(by_index[i] & 1) for i in indices_desc)
-                    # Print one compact line
-                    f.write(f"{base_path}[{','.join(str(i) for i in indices_desc)}] : {bits_desc}\n")
-
-                # Emit scalars (if any) as separate compact lines, preserving first appearance order
-                if scalars:
-                    for _, v in sorted(scalars, key=lambda r: r[0]):
-                        f.write(f"{base_path} : {v}\n")
+        f.write("".join(render_soc_lines(layout, bits)))
 
     print(f"Wrote {outdir / 'bank0_words.out'}")
     print(f"Wrote {outdir / 'bank1_words.out'}")
     print(f"Wrote {soc_out}")
 
-# ---------- Main ----------
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--map", required=True, help="map.out from create_map.py")
-    ap.add_argument("--outdir", default=".", help="directory for output files")
-    args = ap.parse_args()
-
-    outdir = Path(args.outdir)
+# ---------- Packed format ----------
+# frame.bin header: magic, version, layout fingerprint (sha1), bit count.
+# The payload is the SoC bits in base-signal id order followed by the SRAM bank
+# 0 and bank 1 bits (word 0..127, bit 31..0; missing bits as 0), packed
+# MSB-first and zero-padded to a whole byte.
+_PACKED_MAGIC = b"SOCB"
+_PACKED_VERSION = 2
+_PACKED_HEADER = struct.Struct("<4sB3x20sI")
+_BANK_BITS = 128 * 32
+
+def layout_fingerprint(entries: List[Tuple[int, str, int]]) -> str:
+    "SHA-1 over the (idx, signal) pairs of map.out; identical for every frame of a layout."
+    h = hashlib.sha1()
+    for idx, sig, _ in entries:
+        h.update(f"{idx}\t{sig}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def soc_dict_path(dict_dir: Path, fingerprint: str) -> Path:
+    "Dictionary file for a layout; one per fingerprint, so frames of older layouts stay renderable."
+    return dict_dir / f"soc_dict_{fingerprint[:16]}.json"
+
+def _valid_soc_dict(d) -> bool:
+    if not isinstance(d, dict) or d.get("version") != _PACKED_VERSION:
+        return False
+    if not isinstance(d.get("fingerprint"), str) or not isinstance(d.get("nbits"), int):
+        return False
+    signals, banks = d.get("signals"), d.get("banks")
+    if not isinstance(signals, list) or not isinstance(banks, list) or len(banks) != 2:
+        return False
+    if not all(isinstance(r, dict) and isinstance(r.get("src"), list) and isinstance(r.get("path"), str)
+               and "cat" in r and "indices" in r for r in signals):
+        return False
+    if not all(isinstance(bank, list) and len(bank) == _BANK_BITS for bank in banks):
+        return False
+    return d["nbits"] == sum(len(r["src"]) for r in signals) + 2 * _BANK_BITS
+
+def load_soc_dict(path: Path) -> Optional[dict]:
+    "Load a signal dictionary written by write_soc_dict, or None if absent/unreadable."
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            d = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return d if _valid_soc_dict(d) else None
+
+def write_soc_dict(path: Path, fingerprint: str, layout: List[dict], bank_layout: List[List[int]]) -> dict:
+    d = {
+        "version": _PACKED_VERSION,
+        "fingerprint": fingerprint,
+        "nbits": sum(len(rec["src"]) for rec in layout) + 2 * _BANK_BITS,
+        "signals": [dict(id=i, **rec) for i, rec in enumerate(layout)],
+        "banks": bank_layout,
+    }
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(d, f, separators=(",", ":"))
+    print(f"Wrote {path} ({len(layout)} base signals, {d['nbits']} bits)")
+    return d
+
+def pack_bits(bits: List[int]) -> bytes:
+    out = bytearray((len(bits) + 7) // 8)
+    for i, b in enumerate(bits):
+        if b & 1:
+            out[i >> 3] |= 0x80 >> (i & 7)
+    return bytes(out)
+
+def unpack_bits(data: bytes, nbits: int) -> List[int]:
+    return [(data[i >> 3] >> (7 - (i & 7))) & 1 for i in range(nbits)]
+
+def emit_packed(outdir: Path, soc_dict: dict, values: Dict[int, int]) -> None:
+    "Write frame.bin (SoC bits + both SRAM banks) for one frame using the shared signal dictionary."
+    bits = [values[i] for rec in soc_dict["signals"] for i in rec["src"]]
+    for src in soc_dict["banks"]:
+        bits.extend(values[i] if i >= 0 else 0 for i in src)
+    out = outdir / "frame.bin"
+    with out.open("wb") as f:
+        f.write(_PACKED_HEADER.pack(_PACKED_MAGIC, _PACKED_VERSION,
+                                    bytes.fromhex(soc_dict["fingerprint"]), len(bits)))
+        f.write(pack_bits(bits))
+    print(f"Wrote {out}")
+
+def render_packed_frame(bin_path: Path, dict_dir: Path, outdir: Path) -> None:
+    "Render bank0_words.out, bank1_words.out and soc_bits.out for a packed frame."
+    data = bin_path.read_bytes()
+    if len(data) < _PACKED_HEADER.size:
+        raise SystemExit(f"ERROR: {bin_path} is truncated")
+    magic, version, fp, nbits = _PACKED_HEADER.unpack_from(data)
+    if magic != _PACKED_MAGIC or version != _PACKED_VERSION:
+        raise SystemExit(f"ERROR: {bin_path} is not a packed frame file (v{_PACKED_VERSION})")
+    dict_path = soc_dict_path(dict_dir, fp.hex())
+    soc_dict = load_soc_dict(dict_path)
+    if soc_dict is None:
+        raise SystemExit(f"ERROR: cannot read signal dictionary {dict_path}")
+    if soc_dict["fingerprint"] != fp.hex() or soc_dict["nbits"] != nbits:
+        raise SystemExit(f"ERROR: {bin_path} was written for a different layout than {dict_path}")
+    payload = data[_PACKED_HEADER.size:]
+    if len(payload) * 8 < nbits:
+        raise SystemExit(f"ERROR: {bin_path} is truncated")
+
+    bits = unpack_bits(payload, nbits)
+    pos = nbits - 2 * _BANK_BITS
     outdir.mkdir(parents=True, exist_ok=True)
+    for bank, src in enumerate(soc_dict["banks"]):
+        outp = outdir / f"bank{bank}_words.out"
+        with outp.open("w", encoding="utf-8") as f:
+            f.write("".join(render_bank_lines(bank, src, bits[pos:pos + _BANK_BITS])))
+        pos += _BANK_BITS
+        print(f"Wrote {outp}")
+    soc_out = outdir / "soc_bits.out"
+    with soc_out.open("w", encoding="utf-8") as f:
+        f.write("".join(render_soc_lines(soc_dict["signals"], bits[:nbits - 2 * _BANK_BITS])))
+    print(f"Wrote {soc_out}")
 
-    # Read map
-    entries = []
-    with Path(args.map).open("r", encoding="utf-8") as f:
-        for line in f:
-            rec = parse_map_line(line)
-            if rec is None:
-                continue
-            entries.append(rec)  # (idx, signal, val)
-    if not entries:
-        raise SystemExit("ERROR: no entries parsed from map file.")
-
-    # Categorize
-    bank_bits: Dict[int, Dict[int, Dict[int, int]]] = {0: {}, 1: {}}
+# ---------- Frame processing ----------
+def categorize_entries(entries: List[Tuple[int, str, int]]):
+    """
+    Split map entries into SRAM bank bits and SoC base-signal groups.
+    Returns (bank_src, soc_groups); bank_src maps bank -> word -> bit -> map.out idx.
+    """
+    bank_src: Dict[int, Dict[int, Dict[int, int]]] = {0: {}, 1: {}}
     # soc_groups maps "base path" (upper indices preserved, final bit index stripped) to list of entries
     soc_groups: Dict[str, List[Tuple[int, int, str, int]]] = {}
 
@@ -327,7 +479,7 @@ def main():
             word = int(m.group(2))
             bit  = int(m.group(3))
             if bank in (0, 1):
-                bank_bits.setdefault(bank, {}).setdefault(word, {})[bit] = val
+                bank_src.setdefault(bank, {}).setdefault(word, {})[bit] = idx
             else:
                 base = base_strip_last_bit_index(sig_nt)
                 bit_i = last_bit_index(sig_nt)
@@ -336,10 +488,76 @@ def main():
             base = base_strip_last_bit_index(sig_nt)
             bit_i = last_bit_index(sig_nt)
             soc_groups.setdefault(base, []).append((idx, bit_i if bit_i is not None else -1, sig_nt, val))
+    return bank_src, soc_groups
+
+def emit_outputs(outdir: Path, entries: List[Tuple[int, str, int]], fmt: str = "text",
+                 dict_dir: Path = Path("."), soc_dict: Optional[dict] = None) -> Optional[dict]:
+    """
+    Write one frame: the bank files and soc_bits.out (text), or frame.bin (packed).
+    In packed mode, returns the signal dictionary in use so callers handling many
+    frames can pass it back in as soc_dict and skip re-reading it from dict_dir.
+    """
+    values = {idx: val for idx, _, val in entries}
+    fingerprint = layout_fingerprint(entries) if fmt == "packed" else None
+    if soc_dict is not None and soc_dict["fingerprint"] == fingerprint:
+        emit_packed(outdir, soc_dict, values)
+        return soc_dict
+
+    bank_src, soc_groups = categorize_entries(entries)
+    if fmt == "text":
+        emit_bank_files(outdir, build_bank_layout(bank_src), values)
+        emit_soc_file(outdir, soc_groups)
+        return None
+
+    # Packed: one dictionary per layout fingerprint, never overwritten
+    dict_path = soc_dict_path(dict_dir, fingerprint)
+    if dict_path.exists():
+        soc_dict = load_soc_dict(dict_path)
+        if soc_dict is None or soc_dict["fingerprint"] != fingerprint:
+            raise SystemExit(f"ERROR: {dict_path} is unreadable or belongs to another layout; "
+                             f"refusing to overwrite it")
+    else:
+        dict_dir.mkdir(parents=True, exist_ok=True)
+        soc_dict = write_soc_dict(dict_path, fingerprint, build_soc_layout(soc_groups),
+                                  build_bank_layout(bank_src))
+    emit_packed(outdir, soc_dict, values)
+    return soc_dict
+
+# ---------- Main ----------
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--map", help="map.out from create_map.py")
+    ap.add_argument("--outdir", help="directory for output files (default: current dir; "
+                                     "with --render: the directory of the .bin file)")
+    ap.add_argument("--format", choices=("text", "packed"), default="text",
+                    help="text: bank*_words.out + soc_bits.out; packed: frame.bin")
+    ap.add_argument("--dict-dir", default=".",
+                    help="directory of per-layout signal dictionaries (soc_dict_<fingerprint>.json)")
+    ap.add_argument("--render", metavar="BIN", help="render a packed frame.bin as text and exit")
+    args = ap.parse_args()
+
+    if args.render:
+        bin_path = Path(args.render)
+        render_packed_frame(bin_path, Path(args.dict_dir), Path(args.outdir) if args.outdir else bin_path.parent)
+        return
+    if not args.map:
+        ap.error("--map is required (unless --render is given)")
+
+    outdir = Path(args.outdir or ".")
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    # Read map
+    entries = []
+    with Path(args.map).open("r", encoding="utf-8") as f:
+        for line in f:
+            rec = parse_map_line(line)
+            if rec is None:
+                continue
+            entries.append(rec)  # (idx, signal, val)
+    if not entries:
+        raise SystemExit("ERROR: no entries parsed from map file.")
 
-    # Emit outputs
-    emit_bank_files(outdir, bank_bits)
-    emit_soc_file(outdir, soc_groups)
+    emit_outputs(outdir, entries, args.format, Path(args.dict_dir))
 
 if __name__ == "__main__":
     main()
@@ -31,6 +31,16 @@ def load_layout(p: Path):
     lines = [ln for ln in lines if ln.strip() != ""]
     return lines
 
+def map_bits(bits, layout):
+    """
+    Pair scan bits with layout signals (last bit → first signal).
+    Returns [(idx, signal, val), ...] for the first min(len(bits), len(layout)) signals,
+    the same rows map.out holds.
+    """
+    bits_rev = list(reversed(bits))
+    n = min(len(bits_rev), len(layout))
+    return [(i, layout[i], bits_rev[i]) for i in range(n)]
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--bits", required=True, help="bit dump file (0/1 chars)")
@@ -47,17 +57,17 @@ def main():
         raise SystemExit("ERROR: no lines found in --layout")
 
     # Reverse as requested: last bit → first signal
-    bits_rev = list(reversed(bits))
+    rows = map_bits(bits, layout)
 
-    n = min(len(bits_rev), len(layout))
-    if len(bits_rev) != len(layout):
-        print(f"WARNING: bit count ({len(bits_rev)}) != layout count ({len(layout)}). Using n={n} pairs.")
+    n = len(rows)
+    if len(bits) != len(layout):
+        print(f"WARNING: bit count ({len(bits)}) != layout count ({len(layout)}). Using n={n} pairs.")
 
     outp = Path(args.out)
     with outp.open("w", encoding="utf-8") as f:
         f.write("# idx\tsignal\tval\n")
-        for i in range(n):
-            f.write(f"{i}\t{layout[i]}\t{bits_rev[i]}\n")
+        for i, sig, val in rows:
+            f.write(f"{i}\t{sig}\t{val}\n")
 
     print(f"Wrote {n} mappings to {outp} (reverse mapping: last bit → first signal).")
     print(f"  bits file  : {args.bits} (len={len(bits)})")
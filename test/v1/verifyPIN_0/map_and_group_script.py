@@ -8,6 +8,8 @@ START, END = 1, 9
 LAYOUT_FILE = "scan_layout_z_removed.txt"  # change if your layout filename differs
 MAP_SCRIPT = "map.py"
 GROUP_SCRIPT = "group.py"
+SOC_FORMAT = "text"      # "packed" -> frame.bin + dictionary in SOC_DICT_DIR (render with group.py --render)
+SOC_DICT_DIR = "."
 
 PY = sys.executable or "python3"
 
@@ -27,7 +29,8 @@ def main():
 
         run([PY, MAP_SCRIPT, "--bits", bits, "--layout", LAYOUT_FILE, "--out", map_out])
         os.makedirs(outdir, exist_ok=True)
-        run([PY, GROUP_SCRIPT, "--map", map_out, "--outdir", outdir])
+        run([PY, GROUP_SCRIPT, "--map", map_out, "--outdir", outdir,
+             "--format", SOC_FORMAT, "--dict-dir", SOC_DICT_DIR])
 
         print(f"[done] {bits} -> {map_out} -> {outdir}/")
 
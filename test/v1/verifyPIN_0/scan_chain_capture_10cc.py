@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import argparse
 import pigpio
 import time
 import sys
@@ -15,10 +16,40 @@ TDO = 7     # Test Data Out (scan chain output)
 CHAIN_LENGTH = 12756   # number of bits in the scan chain
 NUM_CYCLES   = 10      # number of clock cycles to capture (frames)
 
+# Optional streaming to the analysis host instead of writing frame_N.txt files
+# (receiver: frame_stream.py recv --listen <addr> ...)
+ap = argparse.ArgumentParser()
+ap.add_argument("--stream", metavar="ADDR", help="send frames to host:port or unix:<path> instead of files")
+ap.add_argument("--shot", type=int, default=0, help="shot id tagged on streamed frames")
+args = ap.parse_args()
+
+def save_frame(frame, bit_string):
+    filename = f"frame_{frame}.txt"
+    with open(filename, 'w') as f:
+        f.write(bit_string + "\n")
+    return filename
+
+def fall_back_to_files(sender, err):
+    # Keep every frame the receiver did not acknowledge as a local file
+    print(f"Stream to {args.stream} failed ({err.__cause__ or err}); writing frames locally")
+    sender.abort()
+    for fr in sender.unacked():
+        print(f"Saved unacknowledged frame {fr.cycle} -> {save_frame(fr.cycle, fr.bits)}")
+
+sender = None
+if args.stream:
+    from frame_stream import FrameSender
+    try:
+        sender = FrameSender(args.stream)
+    except OSError as e:
+        print(f"Cannot connect to {args.stream} ({e}); writing frames locally")
+
 # Initialize pigpio and set up GPIO modes
 pi = pigpio.pi()  # Connect to local pigpio daemon (must be running)
 if not pi.connected:
     print("Error: pigpio daemon is not running or connection failed.")
+    if sender is not None:
+        sender.abort()
     sys.exit(1)
 
 # Configure GPIO directions
@@ -36,56 +67,69 @@ pi.write(S_EN, 0)    # scan enable low (functional mode)
 pi.write(S_MODE, 0)  # scan mode low (functional mode)
 pi.write(TDI, 0)     # TDI low (idle)
 
-# Loop over each program clock cycle (frame) to capture
-for frame in range(NUM_CYCLES):
-    # 1. Functional capture phase: pulse the clock once with scan disabled
-    pi.write(S_EN, 0)   # ensure scan chain is in capture (functional) mode
-    pi.write(S_MODE, 0)
-    time.sleep(1e-6)    # small delay for stability
-    # Pulse the clock (rising edge followed by falling edge)
-    pi.write(CLK, 1)
-    time.sleep(1e-6)    # 1 µs high pulse
-    pi.write(CLK, 0)
-    time.sleep(1e-6)    # 1 µs low to complete the cycle
-
-    # 2. Scan shift phase: enable scan mode and shift out captured data
-    pi.write(S_MODE, 1)  # enable scan mode (scan chain ready to shift)
-    pi.write(S_EN, 1)    # enable scan shifting (if required by design)
-    time.sleep(1e-6)
-    bits = []            # list to collect bits for this frame
-    for i in range(CHAIN_LENGTH):
-        # Read the current bit at TDO (scan output)
-        bit_val = pi.read(TDO)
-        # Feed the bit back into TDI (scan input) to preserve chain content
-        pi.write(TDI, bit_val)
-        # Store the bit value ('0' or '1') in our list
-        bits.append('1' if bit_val == 1 else '0')
-        time.sleep(1e-6)  # brief delay after reading and setting TDI
-        # Pulse clock to shift the next bit into TDO
+try:
+    # Loop over each program clock cycle (frame) to capture
+    for frame in range(NUM_CYCLES):
+        # 1. Functional capture phase: pulse the clock once with scan disabled
+        pi.write(S_EN, 0)   # ensure scan chain is in capture (functional) mode
+        pi.write(S_MODE, 0)
+        time.sleep(1e-6)    # small delay for stability
+        # Pulse the clock (rising edge followed by falling edge)
+        t_capture_ns = time.time_ns()
         pi.write(CLK, 1)
-        time.sleep(1e-6)
+        time.sleep(1e-6)    # 1 µs high pulse
         pi.write(CLK, 0)
-        # (After this pulse, the next bit in the chain moves into TDO)
-    # End of shifting loop
+        time.sleep(1e-6)    # 1 µs low to complete the cycle
 
-    # 3. Save the captured scan chain bits to a file for this frame
-    bit_string = ''.join(bits)
-    filename = f"frame_{frame}.txt"
-    with open(filename, 'w') as f:
-        f.write(bit_string + "\n")
-    print(f"Captured frame {frame} -> {filename}")
+        # 2. Scan shift phase: enable scan mode and shift out captured data
+        pi.write(S_MODE, 1)  # enable scan mode (scan chain ready to shift)
+        pi.write(S_EN, 1)    # enable scan shifting (if required by design)
+        time.sleep(1e-6)
+        bits = []            # list to collect bits for this frame
+        for i in range(CHAIN_LENGTH):
+            # Read the current bit at TDO (scan output)
+            bit_val = pi.read(TDO)
+            # Feed the bit back into TDI (scan input) to preserve chain content
+            pi.write(TDI, bit_val)
+            # Store the bit value ('0' or '1') in our list
+            bits.append('1' if bit_val == 1 else '0')
+            time.sleep(1e-6)  # brief delay after reading and setting TDI
+            # Pulse clock to shift the next bit into TDO
+            pi.write(CLK, 1)
+            time.sleep(1e-6)
+            pi.write(CLK, 0)
+            # (After this pulse, the next bit in the chain moves into TDO)
+        # End of shifting loop
+
+        # 3. Save the captured scan chain bits to a file for this frame (or stream them)
+        bit_string = ''.join(bits)
+        if sender is not None:
+            try:
+                sender.submit(args.shot, frame, bit_string, t_capture_ns)
+                print(f"Captured frame {frame} -> {args.stream}")
+            except ConnectionError as e:
+                fall_back_to_files(sender, e)
+                sender = None
+        if sender is None:
+            print(f"Captured frame {frame} -> {save_frame(frame, bit_string)}")
 
-    # 4. Reset scan control signals to capture mode for the next cycle
+        # 4. Reset scan control signals to capture mode for the next cycle
+        pi.write(S_EN, 0)
+        pi.write(S_MODE, 0)
+        # (Now ready to capture the next cycle)
+    # End of capture loop
+finally:
+    # Cleanup: set pins to a safe state and close pigpio connection
+    pi.write(CLK, 0)
+    pi.write(TDI, 0)
+    pi.write(FETCH, 0)
     pi.write(S_EN, 0)
     pi.write(S_MODE, 0)
-    # (Now ready to capture the next cycle)
-# End of capture loop
-
-# Cleanup: set pins to a safe state and close pigpio connection
-pi.write(CLK, 0)
-pi.write(TDI, 0)
-pi.write(FETCH, 0)
-pi.write(S_EN, 0)
-pi.write(S_MODE, 0)
-pi.stop()
+    pi.stop()
 
+    # Flush streamed frames and wait for the receiver to acknowledge them
+    if sender is not None:
+        try:
+            sender.close()
+        except ConnectionError as e:
+            fall_back_to_files(sender, e)